@@ -11,24 +11,43 @@
 
 from __future__ import annotations
 
+import itertools
+import os
 import warnings
-from collections.abc import Sequence
+from collections.abc import Callable, Sequence
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache, partial
 from typing import Any
 
 import numpy as np
 import torch
 
 from monai.metrics.utils import (
+    distance_transform_chamfer34,
     do_metric_reduction,
-    get_mask_edges,
-    get_surface_distance,
     ignore_background,
     prepare_spacing,
 )
-from monai.utils import MetricReduction, convert_data_type
+from monai.utils import MetricReduction, convert_to_cupy, convert_to_tensor, optional_import
 
 from .metric import CumulativeIterationMetric
 
+distance_transform_edt, _ = optional_import("scipy.ndimage.morphology", name="distance_transform_edt")
+distance_transform_cdt, _ = optional_import("scipy.ndimage.morphology", name="distance_transform_cdt")
+generate_binary_structure, _ = optional_import("scipy.ndimage", name="generate_binary_structure")
+cKDTree, _ = optional_import("scipy.spatial", name="cKDTree")
+cp, has_cp = optional_import("cupy")
+cp_ndi, _ = optional_import("cupyx.scipy.ndimage")
+
+# the scale of the integer distances given by the chamfer type of transforms, relative to the distances in pixels
+_INTEGER_DISTANCE_SCALES = {"chessboard": 1, "taxicab": 1, "chamfer34": 3}
+# the Minkowski p-norm of the distance metrics which support nearest-neighbor queries on the edge pixel coordinates
+_KDTREE_P_NORMS = {"euclidean": 2.0, "taxicab": 1.0, "chessboard": np.inf}
+# the boundaries with fewer edge pixels than this fraction of the image size use k-d tree queries on the CPU
+_KDTREE_MAX_EDGES_RATIO = 0.02
+# the size of the tiles of the distance transforms of large images on the CPU, which keeps their working set in cache
+_TILE_SIZE = 256
+
 
 class SurfaceDiceMetric(CumulativeIterationMetric):
     """
@@ -48,8 +67,9 @@ class SurfaceDiceMetric(CumulativeIterationMetric):
         include_background: Whether to skip NSD computation on the first channel of the predicted output.
             Defaults to ``False``.
         distance_metric: The metric used to compute surface distances.
-            One of [``"euclidean"``, ``"chessboard"``, ``"taxicab"``].
-            Defaults to ``"euclidean"``.
+            One of [``"euclidean"``, ``"chessboard"``, ``"taxicab"``, ``"chamfer34"``].
+            ``"chamfer34"`` is a fast approximation of ``"euclidean"``, see
+            :py:func:`monai.metrics.utils.distance_transform_chamfer34`. Defaults to ``"euclidean"``.
         reduction: define mode of reduction to the metrics, will only apply reduction on `not-nan` values,
             available reduction modes: {``"none"``, ``"mean"``, ``"sum"``, ``"mean_batch"``, ``"sum_batch"``,
             ``"mean_channel"``, ``"sum_channel"``}, default to ``"mean"``. if "none", will not do reduction.
@@ -169,6 +189,8 @@ def compute_surface_dice(
     reference segmentation, the class NSD will be 0.
 
     This implementation is based on https://arxiv.org/abs/2111.05408 and supports 2D images.
+    If `cupy` is installed and the inputs are CUDA tensors, the edge extraction and the Euclidean
+    distance transform are computed on the GPU.
     Be aware that the computation of boundaries is different from DeepMind's implementation
     https://github.com/deepmind/surface-distance. In this implementation, the length of a segmentation boundary is
     interpreted as the number of its edge pixels. In DeepMind's implementation, the length of a segmentation boundary
@@ -185,8 +207,9 @@ def compute_surface_dice(
         include_background: Whether to skip the surface dice computation on the first channel of
             the predicted output. Defaults to ``False``.
         distance_metric: The metric used to compute surface distances.
-            One of [``"euclidean"``, ``"chessboard"``, ``"taxicab"``].
-            Defaults to ``"euclidean"``.
+            One of [``"euclidean"``, ``"chessboard"``, ``"taxicab"``, ``"chamfer34"``].
+            ``"chamfer34"`` is a fast approximation of ``"euclidean"``, see
+            :py:func:`monai.metrics.utils.distance_transform_chamfer34`. Defaults to ``"euclidean"``.
         spacing: spacing of pixel (or voxel). This parameter is relevant only if ``distance_metric`` is set to ``"euclidean"``.
             If a single number, isotropic spacing with that value is used for all images in the batch. If a sequence of numbers,
             the length of the sequence must be equal to the image dimensions. This spacing will be used for all images in the batch.
@@ -206,7 +229,7 @@ def compute_surface_dice(
 
     Returns:
         Pytorch Tensor of shape [B,C], containing the NSD values :math:`\operatorname {NSD}_{b,c}` for each batch index
-        :math:`b` and class :math:`c`.
+        :math:`b` and class :math:`c`, on the device of `y_pred`.
     """
 
     if not include_background:
@@ -214,6 +237,9 @@ def compute_surface_dice(
 
     if not isinstance(y_pred, torch.Tensor) or not isinstance(y, torch.Tensor):
         raise ValueError("y_pred and y must be PyTorch Tensor.")
+    # the metadata of `MetaTensor` inputs does not apply to the [B,C] scores derived from them,
+    # the inputs are viewed as plain tensors without copying them
+    y_pred, y = y_pred.as_subclass(torch.Tensor), y.as_subclass(torch.Tensor)
 
     if y_pred.ndimension() != 4 or y.ndimension() != 4:
         raise ValueError("y_pred and y should have four dimensions: [B,C,H,W].")
@@ -223,55 +249,412 @@ def compute_surface_dice(
             f"y_pred and y should have same shape, but instead, shapes are {y_pred.shape} (y_pred) and {y.shape} (y)."
         )
 
-    if not torch.all(y_pred.byte() == y_pred) or not torch.all(y.byte() == y):
-        raise ValueError("y_pred and y should be binarized tensors (e.g. torch.int64).")
-    if torch.any(y_pred > 1) or torch.any(y > 1):
+    # a single check of each tensor when the inputs are valid, the invalid values are only diagnosed on failure
+    if not _is_binary(y_pred) or not _is_binary(y):
+        if not torch.all(y_pred.byte() == y_pred) or not torch.all(y.byte() == y):
+            raise ValueError("y_pred and y should be binarized tensors (e.g. torch.int64).")
         raise ValueError("y_pred and y should be one-hot encoded.")
 
-    y = y.float()
-    y_pred = y_pred.float()
-
     batch_size, n_class = y_pred.shape[:2]
+    device = y_pred.device
 
     if n_class != len(class_thresholds):
         raise ValueError(
             f"number of classes ({n_class}) does not match number of class thresholds ({len(class_thresholds)})."
         )
 
-    if any(~np.isfinite(class_thresholds)):
+    thr = np.asarray(class_thresholds, dtype=np.float64)
+    if not np.isfinite(thr).all():
         raise ValueError("All class thresholds need to be finite.")
 
-    if any(np.array(class_thresholds) < 0):
+    if (thr < 0).any():
         raise ValueError("All class thresholds need to be >= 0.")
 
-    nsd = np.empty((batch_size, n_class))
+    # the chamfer type of transforms give integer distances, they are compared with thresholds quantized identically
+    # instead of being converted to floats
+    class_thr: list[float] | list[int] = thr.tolist()
+    if distance_metric in _INTEGER_DISTANCE_SCALES:
+        class_thr = _quantize_thresholds(thr, _INTEGER_DISTANCE_SCALES[distance_metric])
+
+    # extract the edges of all (b, c) images at once, with the same device as the inputs
+    get_edges = _get_compiled_edges_and_counts() if y_pred.device.type == "cuda" else None
+    edges_pred_all, edges_gt_all, n_edges_pred, n_edges_gt = (get_edges or _get_edges_and_counts)(y_pred, y)
+    boundary_complete = n_edges_pred + n_edges_gt
+    # the [B,C] numbers of edge pixels are the only values copied to the host, with a single synchronization,
+    # for the warnings, short-circuits and grouping of the images. The NSD itself is computed on the device.
+    n_edges = torch.stack([n_edges_pred, n_edges_gt]).cpu().numpy()
+    has_pred, has_gt = n_edges[0] > 0, n_edges[1] > 0
+
+    # one warning per call and per kind of empty edge map, listing the classes
+    for name, has_edges in (("ground truth", has_gt), ("prediction", has_pred)):
+        empty_classes = np.unique(np.nonzero(~has_edges)[1]).tolist()
+        if empty_classes:
+            plural = len(empty_classes) > 1
+            warnings.warn(
+                f"the {name} of class{'es' if plural else ''} {', '.join(map(str, empty_classes))} "
+                f"{'are' if plural else 'is'} all 0, this may result in nan/inf distance."
+            )
 
     img_dim = y_pred.ndim - 2
     spacing_list = prepare_spacing(spacing=spacing, batch_size=batch_size, img_dim=img_dim)
 
-    for b, c in np.ndindex(batch_size, n_class):
-        (edges_pred, edges_gt) = get_mask_edges(y_pred[b, c], y[b, c], crop=False)
-        if not np.any(edges_gt):
-            warnings.warn(f"the ground truth of class {c} is all 0, this may result in nan/inf distance.")
-        if not np.any(edges_pred):
-            warnings.warn(f"the prediction of class {c} is all 0, this may result in nan/inf distance.")
-
-        distances_pred_gt = get_surface_distance(
-            edges_pred, edges_gt, distance_metric=distance_metric, spacing=spacing_list[b]
+    if not (has_gt & has_pred).any():
+        # no distance is needed: the NSD is nan if both boundaries are empty, 0 if only one of them is
+        return _get_nsd(torch.zeros_like(boundary_complete), boundary_complete)
+
+    # use cupy/cupyx.scipy.ndimage on the GPU to avoid the device to host copies of each (b, c) image
+    use_cp = has_cp and y_pred.device.type == "cuda"
+    lib = cp if use_cp else np
+    if use_cp:
+        edges_pred_all, edges_gt_all = convert_to_cupy(edges_pred_all), convert_to_cupy(edges_gt_all)
+    else:
+        edges_pred_all, edges_gt_all = edges_pred_all.cpu().numpy(), edges_gt_all.cpu().numpy()
+
+    # sparse boundaries are processed with k-d trees on the edge pixel coordinates instead of distance transforms
+    use_kdtree = np.zeros((batch_size, n_class), dtype=bool)
+    if not use_cp and distance_metric in _KDTREE_P_NORMS:
+        use_kdtree = n_edges.sum(axis=0) < _KDTREE_MAX_EDGES_RATIO * np.prod(y_pred.shape[2:])
+    sparse_pairs: list[tuple[int, int]] = []
+    # group the other (b, c) images with edges in both maps by spacing, their distance transforms are computed at once
+    groups: dict[tuple[float, ...] | None, list[tuple[int, int]]] = {}
+    # if an edge map is empty, the distances towards it are inf and none of the boundary elements is correct
+    for b, c in np.argwhere(has_gt & has_pred).tolist():
+        if use_kdtree[b, c]:
+            sparse_pairs.append((b, c))
+            continue
+        spacing_b = spacing_list[b]
+        key = None if spacing_b is None else tuple(float(i) for i in np.broadcast_to(spacing_b, (img_dim,)))
+        groups.setdefault(key, []).append((b, c))
+
+    # the distances of the groups and of the sparse boundaries are computed by independent tasks, each returning the
+    # distances and their index in the `rows` of the task
+    tasks: list[tuple[Any, Callable[[], list[tuple[Any, Any]]]]] = []
+    stacks = list(groups.items())
+    if not use_cp and groups:
+        # on the CPU, the groups are split along the stack axis into chunks for up to one thread per core
+        n_chunks = max((os.cpu_count() or 1) // len(groups), 1)
+        stacks = []
+        for spacing_b, pairs in groups.items():
+            n = min(n_chunks, len(pairs))
+            stacks.extend((spacing_b, pairs[i * len(pairs) // n : (i + 1) * len(pairs) // n]) for i in range(n))
+    use_pool = not use_cp and len(stacks) + len(sparse_pairs) > 1
+    for spacing_b, pairs in stacks:
+        b_idx, c_idx = (list(i) for i in zip(*pairs))
+        rows = lib.asarray([b * n_class + c for b, c in pairs])
+        task = partial(
+            _get_stacked_distances,
+            edges_pred_all[b_idx, c_idx],
+            edges_gt_all[b_idx, c_idx],
+            distance_metric=distance_metric,
+            spacing=spacing_b,
+            use_cp=use_cp,
+            max_distance=float(thr.max()),
+            workers=1 if use_pool else -1,
         )
-        distances_gt_pred = get_surface_distance(
-            edges_gt, edges_pred, distance_metric=distance_metric, spacing=spacing_list[b]
+        tasks.append((rows, task))
+    for b, c in sparse_pairs:
+        task = partial(
+            _get_kdtree_distances,
+            edges_pred_all[b, c],
+            edges_gt_all[b, c],
+            distance_metric=distance_metric,
+            spacing=spacing_list[b],
+            workers=1 if use_pool else -1,
         )
+        tasks.append((np.asarray([b * n_class + c]), task))
+
+    if use_pool:
+        # the `scipy` distance transforms and k-d tree queries release the GIL, so the tasks run in parallel threads
+        with ThreadPoolExecutor() as executor:
+            results = list(executor.map(lambda task: task(), (task for _, task in tasks)))
+    else:
+        results = [task() for _, task in tasks]
+
+    # the distances of the edge pixels of all the images are packed into a flat array, along with the (b, c) row of
+    # each distance, so that they are compared with the class thresholds and counted at once
+    dist_list, row_list = [], []
+    for (rows, _), result in zip(tasks, results):
+        for distances, index in result:
+            dist_list.append(distances)
+            row_list.append(rows[index])
+
+    boundary_correct = torch.zeros_like(boundary_complete)
+    if dist_list:
+        dist_flat, row_ids = lib.concatenate(dist_list), lib.concatenate(row_list)
+        within_thr = dist_flat <= lib.asarray(class_thr)[row_ids % n_class]
+        n_correct = lib.bincount(row_ids[within_thr], minlength=batch_size * n_class)
+        # with `cupy`, the counts are already on `device` and are shared with the output tensor without a copy
+        boundary_correct = convert_to_tensor(n_correct, device=device, track_meta=False)
+        boundary_correct = boundary_correct.reshape(batch_size, n_class)
+
+    return _get_nsd(boundary_correct, boundary_complete)
+
+
+def _get_nsd(boundary_correct: torch.Tensor, boundary_complete: torch.Tensor) -> torch.Tensor:
+    """
+    Returns the NSD from the numbers of correct and of all boundary elements, as a float tensor on their device.
+    The NSD is nan if the class is neither present in the prediction, nor in the reference segmentation.
+    """
+    nsd = torch.where(
+        boundary_complete > 0,
+        boundary_correct.double() / boundary_complete.clamp(min=1),
+        torch.full_like(boundary_complete, float("nan"), dtype=torch.double),
+    )
+    return nsd.float()
 
-        boundary_complete = len(distances_pred_gt) + len(distances_gt_pred)
-        boundary_correct = np.sum(distances_pred_gt <= class_thresholds[c]) + np.sum(
-            distances_gt_pred <= class_thresholds[c]
-        )
 
-        if boundary_complete == 0:
-            # the class is neither present in the prediction, nor in the reference segmentation
-            nsd[b, c] = np.nan
+def _is_binary(x: torch.Tensor) -> bool:
+    """
+    Returns whether all the values of `x` are 0 or 1, skipping the scans that the dtype of `x` makes unnecessary.
+    """
+    if x.dtype == torch.bool or x.numel() == 0:
+        return True
+    if x.dtype == torch.uint8:
+        return bool(x.max() <= 1)
+    if not x.is_floating_point() and not x.is_complex():
+        # the integer values are 0 or 1 if they are within [0, 1], no boolean temporaries are needed
+        return bool(x.min() >= 0) and bool(x.max() <= 1)
+    return bool(((x == 0) | (x == 1)).all())
+
+
+def _distance_transform(
+    img: Any, distance_metric: str, spacing: Sequence[float] | None = None, use_cp: bool = False
+) -> Any:
+    """
+    Computes, for each image of the stack `img` [N,H,W], the distance of each non-zero element to its nearest zero
+    element, with the transform corresponding to `distance_metric` (see
+    :py:func:`monai.metrics.utils.get_surface_distance`). The whole stack is processed with a single call.
+    Each image of the stack must have at least one zero element. The chamfer type of transforms return
+    integer distances, scaled by ``_INTEGER_DISTANCE_SCALES[distance_metric]``.
+    If `use_cp`, `img` and the output are `cupy` arrays, the transforms without a `cupyx` counterpart
+    are computed on the host.
+    """
+    if distance_metric == "euclidean":
+        # a spacing along the stack axis larger than any in-plane distance keeps the images independent
+        sampling = tuple(spacing) if spacing is not None else (1.0,) * (img.ndim - 1)
+        sampling = (sum(n * s for n, s in zip(img.shape[1:], sampling)) + 1.0, *sampling)
+        if use_cp:
+            return cp_ndi.distance_transform_edt(img, sampling=sampling)
+        return distance_transform_edt(img, sampling=sampling)
+    if distance_metric in {"chessboard", "taxicab"}:
+        # a structuring element without connectivity along the stack axis keeps the images independent
+        metric = np.zeros((3,) * img.ndim, dtype=bool)
+        metric[1] = generate_binary_structure(img.ndim - 1, img.ndim - 1 if distance_metric == "chessboard" else 1)
+        dis = distance_transform_cdt(cp.asnumpy(img) if use_cp else img, metric=metric)
+    elif distance_metric == "chamfer34":
+        dis = distance_transform_chamfer34(cp.asnumpy(img) if use_cp else img)
+    else:
+        raise ValueError(f"distance_metric {distance_metric} is not implemented.")
+    return cp.asarray(dis) if use_cp else dis
+
+
+def _get_stacked_distances(
+    edges_pred: Any,
+    edges_gt: Any,
+    distance_metric: str,
+    spacing: Sequence[float] | None = None,
+    use_cp: bool = False,
+    max_distance: float | None = None,
+    workers: int = 1,
+) -> list[tuple[Any, Any]]:
+    """
+    Computes the surface distances of a stack of N pairs of edge maps [N,H,W], from `edges_pred` to `edges_gt` and
+    from `edges_gt` to `edges_pred`, with one distance transform of the whole stack. Each edge map must be non-empty.
+
+    If `max_distance` is given, only the distances up to `max_distance` need to be exact, the larger ones only need
+    to remain larger. The large images may then be processed on the CPU by tiles of ``_TILE_SIZE`` pixels (see
+    :py:func:`_get_tiles`), each with a halo wide enough to contain the edge pixels within `max_distance` of the tile.
+    The tiles are processed in parallel threads if `workers` is not 1, a negative value meaning all the cores.
+
+    Returns:
+        for each direction and each tile, the distances and the index in the stack of the image of each distance.
+    """
+    lib = cp if use_cp else np
+    n = len(edges_pred)
+    targets, sources = lib.concatenate([~edges_gt, ~edges_pred]), (edges_pred, edges_gt)
+    tiles = None if use_cp else _get_tiles(targets.shape[1:], distance_metric, spacing, max_distance)
+    if tiles is None:
+        # one distance transform per edge map, indexed by the edges of the other map for each direction
+        dt = _distance_transform(targets, distance_metric=distance_metric, spacing=spacing, use_cp=use_cp)
+        distances = []
+        for dt_target, edges in ((dt[:n], sources[0]), (dt[n:], sources[1])):
+            index, *coords = lib.nonzero(edges)
+            distances.append((dt_target[(index, *coords)], index))
+        return distances
+
+    def get_tile_distances(tile: tuple[tuple[slice, ...], tuple[slice, ...], tuple[slice, ...]]) -> list:
+        core, window, core_in_window = tile
+        tile_sources = [edges[(slice(None), *core)] for edges in sources]
+        if not any(edges.any() for edges in tile_sources):
+            return []
+        tile_targets = targets[(slice(None), *window)]
+        # the images of the stack without any target element in the window have all their distances beyond it
+        empty = tile_targets.reshape(len(tile_targets), -1).all(axis=1)
+        if empty.all():
+            dt = np.full(tile_targets.shape, np.inf)
+        else:
+            dt = _distance_transform(tile_targets, distance_metric=distance_metric, spacing=spacing)
+            dt[empty] = np.inf
+        dt = dt[(slice(None), *core_in_window)]
+        distances = []
+        for dt_target, edges in ((dt[:n], tile_sources[0]), (dt[n:], tile_sources[1])):
+            index, *coords = np.nonzero(edges)
+            distances.append((dt_target[(index, *coords)], index))
+        return distances
+
+    if workers == 1:
+        results = [get_tile_distances(tile) for tile in tiles]
+    else:
+        with ThreadPoolExecutor(max_workers=None if workers < 0 else workers) as executor:
+            results = list(executor.map(get_tile_distances, tiles))
+    return [distances for result in results for distances in result]
+
+
+def _get_tiles(
+    shape: Sequence[int], distance_metric: str, spacing: Sequence[float] | None, max_distance: float | None
+) -> list[tuple[tuple[slice, ...], tuple[slice, ...], tuple[slice, ...]]] | None:
+    """
+    Returns the tiles of an image of size `shape` for :py:func:`_get_stacked_distances`, as the slices of each tile
+    in the image, of the tile with its halo in the image, and of the tile in the latter.
+    Returns None if the image is small enough to be processed at once, or if the halos would be larger than the tiles.
+
+    Only the "euclidean" transform is tiled: the chamfer type of transforms are raster sweeps which already stream
+    through the image, and they get slower with the overlap of the halos. The target elements within `max_distance`
+    of a tile are within ``max_distance / spacing`` pixels of it along each axis.
+    """
+    if max_distance is None or distance_metric != "euclidean" or max(shape) <= _TILE_SIZE:
+        return None
+    sampling = (1.0,) * len(shape)
+    if spacing is not None:
+        sampling = tuple(float(s) for s in np.broadcast_to(spacing, (len(shape),)))
+    halos = [int(np.ceil(max_distance / s)) + 1 for s in sampling]
+    if max(halos) >= _TILE_SIZE:
+        return None
+    axes = []
+    for size, halo in zip(shape, halos):
+        axis = []
+        for start in range(0, size, _TILE_SIZE):
+            stop = min(start + _TILE_SIZE, size)
+            lo, hi = max(start - halo, 0), min(stop + halo, size)
+            axis.append((slice(start, stop), slice(lo, hi), slice(start - lo, stop - lo)))
+        axes.append(axis)
+    return [tuple(zip(*tile)) for tile in itertools.product(*axes)]  # type: ignore[misc]
+
+
+def _get_kdtree_distances(
+    edges_pred: np.ndarray, edges_gt: np.ndarray, distance_metric: str, spacing: Any = None, workers: int = -1
+) -> list[tuple[np.ndarray, np.ndarray]]:
+    """
+    Computes the surface distances from `edges_pred` to `edges_gt` and from `edges_gt` to `edges_pred`, with
+    nearest-neighbor queries between the coordinates of the edge pixels. The cost depends on the number of edge
+    pixels rather than on the image size, as for the distance transforms. Both edge maps must be non-empty.
+
+    The distances are computed from the offsets to the nearest neighbors as in `scipy.ndimage`, so that they are
+    identical to the ones read from the distance transforms. `workers` is the number of threads of the queries.
+
+    Returns:
+        for each direction, the distances and their image index (always 0), like :py:func:`_get_stacked_distances`.
+    """
+    coords_pred, coords_gt = np.argwhere(edges_pred), np.argwhere(edges_gt)
+    p = _KDTREE_P_NORMS[distance_metric]
+    # with unit spacing, the integer coordinates are used as they are
+    sampling = None
+    if distance_metric == "euclidean" and spacing is not None:
+        sampling = np.broadcast_to(np.asarray(spacing, dtype=np.float64), (coords_pred.shape[1],))
+    distances = []
+    for source, target in ((coords_pred, coords_gt), (coords_gt, coords_pred)):
+        if sampling is None:
+            _, nn = cKDTree(target).query(source, k=1, p=p, workers=workers)
         else:
-            nsd[b, c] = boundary_correct / boundary_complete
+            _, nn = cKDTree(target * sampling).query(source * sampling, k=1, p=p, workers=workers)
+        offsets = source - target[nn]
+        if distance_metric == "euclidean":
+            if sampling is not None:
+                offsets = offsets * sampling
+            dist = np.sqrt(np.add.reduce(offsets * offsets, axis=1))
+        elif distance_metric == "taxicab":
+            dist = np.abs(offsets).sum(axis=1)
+        else:
+            dist = np.abs(offsets).max(axis=1)
+        distances.append((dist, np.zeros(len(dist), dtype=np.intp)))
+    return distances
+
+
+def _quantize_thresholds(thr: np.ndarray, scale: int) -> list[int]:
+    """
+    Returns, for each threshold `t` of `thr`, the largest integer `q` such that `q / scale <= t`,
+    so that an integer distance `d` satisfies `d <= q` if and only if `d / scale <= t`.
+    """
+    q = np.floor(thr * scale)
+    # correct the rounding errors of `thr * scale`, e.g. for thresholds which are multiples of 1 / 3
+    q = np.where(q / scale > thr, q - 1, q)
+    q = np.where((q + 1) / scale <= thr, q + 1, q)
+    return [int(i) for i in q]
 
-    return convert_data_type(nsd, output_type=torch.Tensor, device=y_pred.device, dtype=torch.float)[0]
+
+def _get_edges_and_counts(
+    y_pred: torch.Tensor, y: torch.Tensor
+) -> tuple[torch.Tensor, torch.Tensor, torch.Tensor, torch.Tensor]:
+    """
+    Returns the edges of `y_pred` and `y` [B,C,H,W] (see :py:func:`_get_mask_edges_batched`), along with the [B,C]
+    numbers of edge pixels of each. The number of edge pixels of each (b, c) image is also its number of distances
+    towards the other edge map, so the size of the boundaries is known without computing the distances.
+    """
+    edges_pred, edges_gt = _get_mask_edges_batched(y_pred), _get_mask_edges_batched(y)
+    return edges_pred, edges_gt, edges_pred.flatten(2).sum(dim=2), edges_gt.flatten(2).sum(dim=2)
+
+
+@lru_cache(None)
+def _get_compiled_edges_and_counts(backend: str = "inductor") -> Callable | None:
+    """
+    Returns :py:func:`_get_edges_and_counts` compiled with `torch.compile`, which fuses the shifted logical operations
+    of the erosions and the counts into a few kernels, or None if `torch.compile` (or `triton`, for the default
+    ``"inductor"`` `backend`) is not available.
+    It is only used for CUDA tensors: on the CPU, the eager operations are already memory bound and the compilation
+    would require a C++ compiler. With dynamic shapes, the image sizes do not trigger recompilations.
+
+    The metadata of `MetaTensor` inputs is dropped before the compiled call, as Dynamo cannot trace them.
+    If the compilation fails (a `torch._dynamo` or backend compiler error), a warning is issued and the eager version
+    is used from then on. The other errors, e.g. out of memory errors, are raised as in eager mode.
+    """
+    _, has_triton = optional_import("triton")
+    if not hasattr(torch, "compile") or (backend == "inductor" and not has_triton):
+        return None
+    from torch._dynamo.exc import TorchDynamoException
+
+    compiled = torch.compile(_get_edges_and_counts, fullgraph=True, dynamic=True, backend=backend)
+    use_compiled = True
+
+    def get_edges_and_counts(
+        y_pred: torch.Tensor, y: torch.Tensor
+    ) -> tuple[torch.Tensor, torch.Tensor, torch.Tensor, torch.Tensor]:
+        nonlocal use_compiled
+        y_pred, y = y_pred.as_subclass(torch.Tensor), y.as_subclass(torch.Tensor)
+        if use_compiled:
+            try:
+                return compiled(y_pred, y)  # type: ignore[no-any-return]
+            except TorchDynamoException as e:
+                use_compiled = False
+                warnings.warn(f"torch.compile of the surface dice edges failed, falling back to eager mode: {e}")
+        return _get_edges_and_counts(y_pred, y)
+
+    return get_edges_and_counts
+
+
+def _get_mask_edges_batched(seg: torch.Tensor) -> torch.Tensor:
+    """
+    Batched version of :py:func:`monai.metrics.utils.get_mask_edges` with ``crop=False`` for a
+    binary, batch-first tensor [B,C,H,W]. The edges of all the B*C images are computed at once.
+
+    The binary erosion uses, like `scipy`, a cross-shaped structuring element and a zero border value.
+    It is computed with logical ANDs of the shifted boolean masks, without converting them to floats.
+    """
+    mask = seg.bool()
+    eroded = mask.clone()
+    eroded[..., 1:, :] &= mask[..., :-1, :]
+    eroded[..., :-1, :] &= mask[..., 1:, :]
+    eroded[..., 1:] &= mask[..., :-1]
+    eroded[..., :-1] &= mask[..., 1:]
+    eroded[..., (0, -1), :] = False
+    eroded[..., (0, -1)] = False
+    return mask ^ eroded
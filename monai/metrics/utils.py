@@ -27,7 +27,14 @@ binary_erosion, _ = optional_import("scipy.ndimage.morphology", name="binary_ero
 distance_transform_edt, _ = optional_import("scipy.ndimage.morphology", name="distance_transform_edt")
 distance_transform_cdt, _ = optional_import("scipy.ndimage.morphology", name="distance_transform_cdt")
 
-__all__ = ["ignore_background", "do_metric_reduction", "get_mask_edges", "get_surface_distance", "is_binary_tensor"]
+__all__ = [
+    "ignore_background",
+    "do_metric_reduction",
+    "get_mask_edges",
+    "get_surface_distance",
+    "distance_transform_chamfer34",
+    "is_binary_tensor",
+]
 
 
 def ignore_background(y_pred: NdarrayTensor, y: NdarrayTensor) -> tuple[NdarrayTensor, NdarrayTensor]:
@@ -191,6 +198,8 @@ def get_surface_distance(
             - ``"euclidean"``, uses Exact Euclidean distance transform.
             - ``"chessboard"``, uses `chessboard` metric in chamfer type of transform.
             - ``"taxicab"``, uses `taxicab` metric in chamfer type of transform.
+            - ``"chamfer34"``, uses Borgefors' 3-4 chamfer transform, a fast approximation of the Euclidean
+              distance transform for 2D images (in pixels, within about 6% of the exact distance).
         spacing: spacing of pixel (or voxel) along each axis. If a sequence, must be of
             length equal to the image dimensions; if a single number, this is used for all axes.
             If ``None``, spacing of unity is used. Defaults to ``None``.
@@ -214,12 +223,64 @@ def get_surface_distance(
             dis = distance_transform_edt(~seg_gt, sampling=spacing)
         elif distance_metric in {"chessboard", "taxicab"}:
             dis = distance_transform_cdt(~seg_gt, metric=distance_metric)
+        elif distance_metric == "chamfer34":
+            if seg_gt.ndim != 2:
+                raise ValueError(f"distance_metric {distance_metric} only supports 2D images, got {seg_gt.ndim}D.")
+            dis = distance_transform_chamfer34(~seg_gt) / 3.0
         else:
             raise ValueError(f"distance_metric {distance_metric} is not implemented.")
 
     return np.asarray(dis[seg_pred])
 
 
+def distance_transform_chamfer34(img: np.ndarray) -> np.ndarray:
+    """
+    Compute Borgefors' 3-4 chamfer distance transform over the last two dimensions of `img`: the distance of each
+    non-zero element to the nearest zero element, as in `scipy.ndimage.distance_transform_cdt`.
+    Any leading dimensions are treated as a batch of independent 2D images.
+
+    The transform is computed with a forward and a backward raster sweep, adding 3 for the edge neighbors and 4 for
+    the diagonal neighbors. Each sweep is vectorized along the rows: the dependency on the previous row is a
+    row-wise minimum, and the dependency on the left neighbor is a cumulative minimum.
+    The distances are stored as int16 when they fit, so that twice as many of them are processed per SIMD instruction.
+    See: https://doi.org/10.1016/S0734-189X(86)80047-0.
+
+    Args:
+        img: input image, with a shape of [..., H, W].
+
+    Returns:
+        integer (int16 or int32) distances, three times the approximated Euclidean distances in pixels.
+        Elements which are not connected to any zero element keep a large positive value.
+    """
+    img = np.asarray(img)
+    # the distances are at most 4 * max(H, W), the sentinel leaves room for the additions of the sweeps
+    dtype = np.int16 if 4 * max(img.shape[-2:]) < np.iinfo(np.int16).max // 2 else np.int32
+    dist = np.where(img, dtype(np.iinfo(dtype).max // 2), dtype(0))
+    _chamfer34_forward_sweep(dist)
+    # the backward sweep is the forward sweep of the image flipped along both axes
+    _chamfer34_forward_sweep(dist[..., ::-1, ::-1])
+    return dist
+
+
+def _chamfer34_forward_sweep(dist: np.ndarray) -> None:
+    """
+    In-place forward raster sweep of the 3-4 chamfer transform over the last two dimensions of `dist`.
+    A single row buffer is reused for the candidate distances, so the sweep does not allocate per row.
+    """
+    offset = 3 * np.arange(dist.shape[-1], dtype=dist.dtype)
+    buf = np.empty(dist.shape[:-2] + dist.shape[-1:], dtype=dist.dtype)
+    for i in range(dist.shape[-2]):
+        row = dist[..., i, :]
+        if i > 0:
+            prev = dist[..., i - 1, :]
+            np.minimum(row, np.add(prev, 3, out=buf), out=row)
+            np.minimum(row[..., 1:], np.add(prev[..., :-1], 4, out=buf[..., 1:]), out=row[..., 1:])
+            np.minimum(row[..., :-1], np.add(prev[..., 1:], 4, out=buf[..., :-1]), out=row[..., :-1])
+        # row[j] = min(row[j], row[j - 1] + 3) from left to right, i.e. a cumulative minimum of (row[j] - 3j)
+        np.minimum.accumulate(np.subtract(row, offset, out=buf), axis=-1, out=buf)
+        np.add(buf, offset, out=row)
+
+
 def is_binary_tensor(input: torch.Tensor, name: str) -> None:
     """Determines whether the input tensor is torch binary tensor or not.
 
@@ -0,0 +1,80 @@
+# Copyright (c) MONAI Consortium
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#     http://www.apache.org/licenses/LICENSE-2.0
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from __future__ import annotations
+
+import unittest
+
+import numpy as np
+from parameterized import parameterized
+
+from monai.metrics.utils import distance_transform_chamfer34
+
+
+def reference_chamfer34(img: np.ndarray, inf: int) -> np.ndarray:
+    """
+    Sequential two-pass 3-4 chamfer distance transform of a 2D image, element by element.
+    """
+    h, w = img.shape
+    dist = np.where(img, inf, 0).astype(np.int64)
+    forward = ((-1, -1, 4), (-1, 0, 3), (-1, 1, 4), (0, -1, 3))
+    for i in range(h):
+        for j in range(w):
+            for di, dj, weight in forward:
+                if 0 <= i + di < h and 0 <= j + dj < w:
+                    dist[i, j] = min(dist[i, j], dist[i + di, j + dj] + weight)
+    for i in reversed(range(h)):
+        for j in reversed(range(w)):
+            for di, dj, weight in forward:
+                if 0 <= i - di < h and 0 <= j - dj < w:
+                    dist[i, j] = min(dist[i, j], dist[i - di, j - dj] + weight)
+    return dist
+
+
+def _random_image(shape, fill, seed=0):
+    return np.random.default_rng(seed).random(shape) < fill
+
+
+TEST_CASES = [
+    [_random_image((17, 23), 0.9)],
+    [_random_image((23, 17), 0.5, seed=1)],
+    [_random_image((3, 12, 9), 0.95, seed=2)],  # a batch of images
+    [_random_image((2, 2, 7, 5), 0.8, seed=3)],
+    [_random_image((1, 31), 0.9, seed=4)],  # a single row
+    [_random_image((31, 1), 0.9, seed=5)],  # a single column
+    [_random_image((1, 1), 0.5, seed=6)],
+    [np.ones((6, 8), dtype=bool)],  # no zero element
+    [np.zeros((6, 8), dtype=bool)],
+]
+
+
+class TestDistanceTransformChamfer34(unittest.TestCase):
+    @parameterized.expand(TEST_CASES)
+    def test_value(self, img):
+        result = distance_transform_chamfer34(img)
+        self.assertEqual(result.shape, img.shape)
+        self.assertEqual(result.dtype, np.int16)
+        inf = np.iinfo(np.int16).max // 2
+        for index in np.ndindex(img.shape[:-2]):
+            np.testing.assert_array_equal(result[index], reference_chamfer34(img[index], inf))
+
+    def test_large_image(self):
+        # the distances of images with max(H, W) >= 4096 may not fit in int16, they are computed as int32
+        img = np.ones((2, 6000), dtype=bool)
+        img[0, 0] = False
+        result = distance_transform_chamfer34(img)
+        self.assertEqual(result.dtype, np.int32)
+        np.testing.assert_array_equal(result, reference_chamfer34(img, np.iinfo(np.int32).max // 2))
+        self.assertEqual(result[1, -1], 3 * 5999 + 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -12,16 +12,42 @@
 from __future__ import annotations
 
 import unittest
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
 
 import numpy as np
 import torch
 import torch.nn.functional as F
 
-from monai.metrics.surface_dice import SurfaceDiceMetric
+from monai.data import MetaTensor
+from monai.metrics.surface_dice import (
+    SurfaceDiceMetric,
+    _get_compiled_edges_and_counts,
+    _get_edges_and_counts,
+    compute_surface_dice,
+)
+from monai.metrics.utils import get_mask_edges, get_surface_distance
+from tests.utils import SkipIfBeforePyTorchVersion
 
 _device = "cuda:0" if torch.cuda.is_available() else "cpu"
 
 
+def _reference_nsd(y_pred, y, class_thresholds, distance_metric, spacing):
+    """
+    The [B,C] NSD of the one-hot tensors `y_pred` and `y`, computed for each (b, c) image from its surface distances.
+    """
+    res = np.zeros(y_pred.shape[:2])
+    for b, c in np.ndindex(*res.shape):
+        edges_pred, edges_gt = get_mask_edges(y_pred[b, c], y[b, c], crop=False)
+        distances_pred_gt = get_surface_distance(edges_pred, edges_gt, distance_metric, spacing)
+        distances_gt_pred = get_surface_distance(edges_gt, edges_pred, distance_metric, spacing)
+        res[b, c] = (
+            np.sum(distances_pred_gt <= class_thresholds[c]) + np.sum(distances_gt_pred <= class_thresholds[c])
+        ) / (len(distances_pred_gt) + len(distances_gt_pred))
+    return res
+
+
 class TestAllSurfaceDiceMetrics(unittest.TestCase):
     def test_tolerance_euclidean_distance_with_spacing(self):
         batch_size = 2
@@ -238,6 +264,160 @@ class TestAllSurfaceDiceMetrics(unittest.TestCase):
         expected_res = [[1 - 1 / (36 * 2 + 8 + 4), 1]]
         np.testing.assert_array_almost_equal(res, expected_res)
 
+        # Chamfer 3-4 distance (3 * max + min of the absolute offsets, divided by 3):
+        # background:
+        # 36 boundary pixels have 0 distances; non-zero distances:
+        # distances gt_pred: [3, 11 / 3, 2, 3, 2, 2, 2, 1]
+        # distances pred_gt: [1, 2, 2, 1]
+        # class 1:
+        # distances gt_pred: [17 / 3, 18 / 3, 19 / 3]
+        # distances pred_gt: [19 / 3, 18 / 3, 17 / 3]
+
+        res = SurfaceDiceMetric(class_thresholds=[2.8, 5.5], include_background=True, distance_metric="chamfer34")(
+            predictions_hot, labels_hot
+        )
+        expected_res = [[1 - 3 / (36 * 2 + 8 + 4), 0]]
+        np.testing.assert_array_almost_equal(res, expected_res)
+
+        res = SurfaceDiceMetric(class_thresholds=[3, 6], include_background=True, distance_metric="chamfer34")(
+            predictions_hot, labels_hot
+        )
+        expected_res = [[1 - 1 / (36 * 2 + 8 + 4), 1 - 2 / (3 + 3)]]
+        np.testing.assert_array_almost_equal(res, expected_res)
+
+    def test_sparse_boundaries(self):
+        # small objects in a large image: the distances of their sparse boundaries are computed with k-d trees,
+        # the ones of the background boundaries with distance transforms
+        batch_size = 2
+        n_class = 2
+        class_thresholds = [1, 2.5]
+        predictions = torch.zeros((batch_size, 200, 240), dtype=torch.int64)
+        labels = torch.zeros((batch_size, 200, 240), dtype=torch.int64)
+        predictions[0, 50:60, 40:55] = 1
+        labels[0, 52:63, 41:52] = 1
+        predictions[1, 100:103, 10:30] = 1
+        labels[1, 101:105, 12:33] = 1
+        predictions_hot = F.one_hot(predictions, num_classes=n_class).permute(0, 3, 1, 2)
+        labels_hot = F.one_hot(labels, num_classes=n_class).permute(0, 3, 1, 2)
+
+        for distance_metric, spacing in [
+            ("euclidean", None),
+            ("euclidean", (0.6, 1.3)),
+            ("taxicab", None),
+            ("chessboard", None),
+        ]:
+            res = SurfaceDiceMetric(
+                class_thresholds=class_thresholds, include_background=True, distance_metric=distance_metric
+            )(predictions_hot, labels_hot, spacing=spacing)
+            expected_res = _reference_nsd(predictions_hot, labels_hot, class_thresholds, distance_metric, spacing)
+            np.testing.assert_allclose(res, expected_res, rtol=1e-6)
+
+    def test_large_images(self):
+        # dense boundaries in images larger than a tile: the euclidean distance transforms are computed by tiles
+        batch_size = 2
+        n_class = 2
+        class_thresholds = [1.5, 4]
+        grid_y, grid_x = np.meshgrid(np.arange(300), np.arange(280), indexing="ij")
+        predictions = torch.as_tensor((grid_y // 12 + grid_x // 10) % 2).repeat(batch_size, 1, 1)
+        labels = torch.as_tensor(((grid_y + 3) // 12 + (grid_x + 1) // 11) % 2).repeat(batch_size, 1, 1)
+        labels[1, 150:] = 0
+        predictions_hot = F.one_hot(predictions, num_classes=n_class).permute(0, 3, 1, 2)
+        labels_hot = F.one_hot(labels, num_classes=n_class).permute(0, 3, 1, 2)
+
+        for spacing in [None, (0.6, 1.3)]:
+            res = SurfaceDiceMetric(class_thresholds=class_thresholds, include_background=True)(
+                predictions_hot, labels_hot, spacing=spacing
+            )
+            expected_res = _reference_nsd(predictions_hot, labels_hot, class_thresholds, "euclidean", spacing)
+            np.testing.assert_allclose(res, expected_res, rtol=1e-6)
+
+    def test_multiple_cores(self):
+        # a single group of images with the same spacing is split into chunks, which are processed in parallel
+        grid_y, grid_x = np.meshgrid(np.arange(64), np.arange(60), indexing="ij")
+        predictions = torch.stack([torch.as_tensor((grid_y // (6 + i) + grid_x // 5) % 3) for i in range(4)])
+        labels = torch.stack([torch.as_tensor(((grid_y + i) // 6 + (grid_x + 1) // 5) % 3) for i in range(4)])
+        predictions_hot = F.one_hot(predictions, num_classes=3).permute(0, 3, 1, 2)
+        labels_hot = F.one_hot(labels, num_classes=3).permute(0, 3, 1, 2)
+
+        with mock.patch("os.cpu_count", return_value=1):
+            expected_res = compute_surface_dice(predictions_hot, labels_hot, [1, 2, 3], include_background=True)
+        with mock.patch("os.cpu_count", return_value=4), mock.patch(
+            "monai.metrics.surface_dice.ThreadPoolExecutor", wraps=ThreadPoolExecutor
+        ) as executor:
+            res = compute_surface_dice(predictions_hot, labels_hot, [1, 2, 3], include_background=True)
+        executor.assert_called_once()
+        np.testing.assert_array_equal(res, expected_res)
+
+    def test_meta_tensor_inputs(self):
+        # the scores of MetaTensor inputs are plain tensors, without the metadata of the images
+        predictions = torch.zeros((1, 40, 40), dtype=torch.int64)
+        labels = torch.zeros((1, 40, 40), dtype=torch.int64)
+        predictions[0, 10:20, 10:20] = 1
+        labels[0, 12:22, 11:20] = 1
+        predictions_hot = F.one_hot(predictions, num_classes=2).permute(0, 3, 1, 2)
+        labels_hot = F.one_hot(labels, num_classes=2).permute(0, 3, 1, 2)
+        expected_res = compute_surface_dice(predictions_hot, labels_hot, [1, 1], include_background=True)
+
+        res = compute_surface_dice(
+            MetaTensor(predictions_hot, affine=torch.eye(4) * 2),
+            MetaTensor(labels_hot, affine=torch.eye(4) * 2),
+            [1, 1],
+            include_background=True,
+        )
+        self.assertIs(type(res), torch.Tensor)
+        np.testing.assert_array_equal(res, expected_res)
+
+    def test_inputs_not_copied(self):
+        # the metadata is dropped without copying the inputs, which are often non-contiguous one-hot permutations
+        predictions = torch.zeros((2, 40, 40), dtype=torch.int64)
+        predictions[:, 10:20, 10:20] = 1
+        predictions_hot = MetaTensor(F.one_hot(predictions, num_classes=3).permute(0, 3, 1, 2))
+        labels_hot = MetaTensor(F.one_hot(predictions.roll(2, 1), num_classes=3).permute(0, 3, 1, 2))
+        self.assertFalse(predictions_hot.is_contiguous())
+
+        with mock.patch(
+            "monai.metrics.surface_dice._get_edges_and_counts", wraps=_get_edges_and_counts
+        ) as get_edges_and_counts:
+            compute_surface_dice(predictions_hot, labels_hot, [1, 1, 1], include_background=True)
+        for arg, original in zip(get_edges_and_counts.call_args.args, (predictions_hot, labels_hot)):
+            self.assertIs(type(arg), torch.Tensor)
+            self.assertEqual(arg.data_ptr(), original.data_ptr())
+            self.assertEqual(arg.stride(), original.stride())
+
+    @SkipIfBeforePyTorchVersion((2, 0))
+    def test_compiled_edges(self):
+        # the compiled edge extraction of the CUDA inputs, checked on the CPU with a backend requiring no compiler
+        predictions = (torch.rand((2, 3, 21, 17)) > 0.4).float()
+        labels = (torch.rand((2, 3, 21, 17)) > 0.6).float()
+        expected_res = _get_edges_and_counts(predictions, labels)
+
+        with warnings.catch_warnings():
+            warnings.filterwarnings("error", message="torch.compile")
+            res = _get_compiled_edges_and_counts("aot_eager")(MetaTensor(predictions), MetaTensor(labels))
+        for r, e in zip(res, expected_res):
+            self.assertIs(type(r), torch.Tensor)
+            torch.testing.assert_close(r, e)
+
+        # the runtime errors are raised, the compilation errors fall back to the eager version
+        from torch._dynamo.exc import TorchDynamoException
+
+        compiled = mock.Mock(side_effect=[RuntimeError("CUDA out of memory"), TorchDynamoException("compile failed")])
+        _get_compiled_edges_and_counts.cache_clear()
+        try:
+            with mock.patch.object(torch, "compile", return_value=compiled):
+                get_edges = _get_compiled_edges_and_counts("aot_eager")
+            with self.assertRaisesRegex(RuntimeError, "out of memory"):
+                get_edges(predictions, labels)
+            with self.assertWarns(UserWarning):
+                res = get_edges(predictions, labels)
+            for r, e in zip(res, expected_res):
+                torch.testing.assert_close(r, e)
+            # the eager version is used from then on
+            get_edges(predictions, labels)
+            self.assertEqual(compiled.call_count, 2)
+        finally:
+            _get_compiled_edges_and_counts.cache_clear()
+
     def test_asserts(self):
         batch_size = 1
         n_class = 2
@@ -334,8 +514,17 @@ class TestAllSurfaceDiceMetrics(unittest.TestCase):
         sur_metric_bgr = SurfaceDiceMetric(class_thresholds=[1, 1, 1, 1], include_background=True)
         sur_metric = SurfaceDiceMetric(class_thresholds=[1, 1, 1], include_background=False)
 
-        # test per-class results
-        res_bgr_classes = sur_metric_bgr(predictions_hot, labels_hot)
+        # test per-class results, with a single warning per kind of empty class
+        with warnings.catch_warnings(record=True) as w:
+            warnings.simplefilter("always")
+            res_bgr_classes = sur_metric_bgr(predictions_hot, labels_hot)
+        self.assertEqual(
+            [str(i.message) for i in w],
+            [
+                "the ground truth of classes 1, 3 are all 0, this may result in nan/inf distance.",
+                "the prediction of classes 2, 3 are all 0, this may result in nan/inf distance.",
+            ],
+        )
         np.testing.assert_array_equal(res_bgr_classes, [[1, 0, 0, np.nan]])
         res_classes = sur_metric(predictions_hot, labels_hot)
         np.testing.assert_array_equal(res_classes, [[0, 0, np.nan]])